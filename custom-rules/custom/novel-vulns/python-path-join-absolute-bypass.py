@@ -12,7 +12,7 @@ import os
 import os.path
 import sys
 from pathlib import Path, PurePath, PurePosixPath, PureWindowsPath
-from flask import request
+from flask import request, send_file
 from werkzeug.utils import secure_filename
 
 UPLOAD_DIR = "/var/www/uploads"
@@ -66,3 +66,16 @@ def test_safe_patterns():
     # ok: python-yaml-load-no-loader
     # ok: python-yaml-load-unsafe-loader
     yaml.load_all(data, Loader=yaml.SafeLoader)
+
+
+# ============================================================================
+# HELPER STUBS (for test execution)
+# ============================================================================
+
+def get_user_input():
+    """Stub for an attacker-controlled value"""
+    return ''
+
+def process(x):
+    """Stub for downstream handling of a value"""
+    return x
@@ -317,8 +317,7 @@ app.post('/lodash-merge-internal', (req, res) => {
 // Complex attack scenarios from CVE-2025-55182
 // =============================================================================
 
-// ruleid: prototype-pollution-object-assign
-// ruleid: prototype-pollution-to-child-process
+// ruleid: prototype-pollution-object-assign, prototype-pollution-to-child-process
 app.post('/realistic-exploit-chain', (req, res) => {
   // Step 1: Pollution happens here
   const userConfig = Object.assign({}, req.body);
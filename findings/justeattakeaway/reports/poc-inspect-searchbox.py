@@ -1,70 +1,114 @@
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+import asyncio
 import json
+import re
+import sys
+from urllib.parse import urlparse
 
-with sync_playwright() as p:
-    browser = p.chromium.launch(headless=True)
-    page = browser.new_page()
+# All DOM extraction in one page.evaluate: each locator/get_attribute call is
+# a separate CDP round-trip
+EXTRACT_JS = """() => {
+    const attr = (el, name) => el.getAttribute(name) || '';
+    return {
+        inputs: [...document.querySelectorAll('input')].slice(0, 10).map(el => ({
+            placeholder: attr(el, 'placeholder'),
+            name: attr(el, 'name'),
+            id: attr(el, 'id'),
+            class: attr(el, 'class'),
+        })),
+        searchElements: [...document.querySelectorAll(
+            '[class*="search"], [id*="search"], [data-test*="search"], [placeholder*="direcc"], [placeholder*="address"]'
+        )].slice(0, 5).map(el => ({tag: el.tagName, class: attr(el, 'class')})),
+        scripts: [...document.querySelectorAll('script[src]')].slice(0, 15).map(el => attr(el, 'src')),
+    };
+}"""
 
-    print("Navigating to just-eat.es...")
-    page.goto('https://www.just-eat.es/', wait_until='networkidle', timeout=30000)
+DEFAULT_URLS = ['https://www.just-eat.es/']
 
-    print("Taking screenshot...")
-    page.screenshot(path='/tmp/justeat-es.png', full_page=True)
-    print("Screenshot saved to /tmp/justeat-es.png")
 
-    # Find input fields
-    print("\n=== INPUT FIELDS ===")
-    inputs = page.locator('input').all()
-    for i, inp in enumerate(inputs[:10]):  # First 10 inputs
-        try:
-            placeholder = inp.get_attribute('placeholder') or ''
-            name = inp.get_attribute('name') or ''
-            id_attr = inp.get_attribute('id') or ''
-            class_attr = inp.get_attribute('class') or ''
-            print(f"Input {i}: placeholder='{placeholder}', name='{name}', id='{id_attr}', class='{class_attr[:80]}'")
-        except:
-            pass
-
-    # Search for f-searchbox, fozzie, vue references
-    print("\n=== SEARCHING FOR COMPONENT REFERENCES ===")
-    html = page.content()
-
-    if 'f-searchbox' in html:
-        print("FOUND: f-searchbox reference in page HTML")
-    else:
-        print("NOT FOUND: f-searchbox")
-
-    if 'fozzie' in html:
-        print("FOUND: fozzie reference in page HTML")
-    else:
-        print("NOT FOUND: fozzie")
-
-    if 'vue' in html.lower():
-        print("FOUND: vue reference in page HTML")
-    else:
-        print("NOT FOUND: vue")
-
-    # Look for search-related elements
-    print("\n=== SEARCH-RELATED ELEMENTS ===")
-    search_elements = page.locator('[class*="search"], [id*="search"], [data-test*="search"], [placeholder*="direcc"], [placeholder*="address"]').all()
-    for i, el in enumerate(search_elements[:5]):
-        try:
-            tag = el.evaluate('el => el.tagName')
-            class_attr = el.get_attribute('class') or ''
-            print(f"Search element {i}: <{tag}> class='{class_attr[:100]}'")
-        except:
-            pass
-
-    # Get all script sources
-    print("\n=== SCRIPT SOURCES (checking for component bundles) ===")
-    scripts = page.locator('script[src]').all()
-    for script in scripts[:15]:
-        try:
-            src = script.get_attribute('src') or ''
+def screenshot_path(url, index):
+    # Host, path and sweep index, so targets on one host keep their own file
+    parsed = urlparse(url)
+    host = parsed.hostname or 'page'
+    if host.startswith('www.'):
+        host = host[4:]
+    name = '-'.join(filter(None, [host.replace('.', '-'), re.sub(r'[^A-Za-z0-9]+', '-', parsed.path).strip('-')]))
+    return f"/tmp/{name}-{index}.png"
+
+
+async def inspect(browser, url, index):
+    # Fresh context per target on a shared browser; workers are not needed
+    context = await browser.new_context(java_script_enabled=True, bypass_csp=True, service_workers='block')
+    try:
+        page = await context.new_page()
+
+        print(f"Navigating to {url}...")
+        await page.goto(url, wait_until='networkidle', timeout=30000)
+
+        # The page has settled (networkidle): screenshot, DOM extraction and
+        # HTML capture are independent CDP calls, so run them concurrently
+        print("Taking screenshot...")
+        shot = screenshot_path(url, index)
+        _, dom, html = await asyncio.gather(
+            page.screenshot(path=shot, full_page=True),
+            page.evaluate(EXTRACT_JS),
+            page.content(),
+        )
+        print(f"Screenshot saved to {shot}")
+
+        # Find input fields
+        print("\n=== INPUT FIELDS ===")
+        for i, inp in enumerate(dom['inputs']):  # First 10 inputs
+            print(f"Input {i}: placeholder='{inp['placeholder']}', name='{inp['name']}', id='{inp['id']}', class='{inp['class'][:80]}'")
+
+        # Search for f-searchbox, fozzie, vue references
+        print("\n=== SEARCHING FOR COMPONENT REFERENCES ===")
+        if 'f-searchbox' in html:
+            print("FOUND: f-searchbox reference in page HTML")
+        else:
+            print("NOT FOUND: f-searchbox")
+
+        if 'fozzie' in html:
+            print("FOUND: fozzie reference in page HTML")
+        else:
+            print("NOT FOUND: fozzie")
+
+        if 'vue' in html.lower():
+            print("FOUND: vue reference in page HTML")
+        else:
+            print("NOT FOUND: vue")
+
+        # Look for search-related elements
+        print("\n=== SEARCH-RELATED ELEMENTS ===")
+        for i, el in enumerate(dom['searchElements']):
+            print(f"Search element {i}: <{el['tag']}> class='{el['class'][:100]}'")
+
+        # Get all script sources
+        print("\n=== SCRIPT SOURCES (checking for component bundles) ===")
+        for src in dom['scripts']:
             if 'search' in src.lower() or 'fozzie' in src.lower() or 'component' in src.lower():
                 print(f"Relevant script: {src}")
-        except:
-            pass
+    finally:
+        await context.close()
+
+
+async def main(urls):
+    # One Chromium launch for the whole sweep
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            for index, url in enumerate(urls):
+                # One unreachable or slow target must not end the sweep
+                try:
+                    await inspect(browser, url, index)
+                except Exception as e:
+                    print(f"FAILED: {url}: {e}", file=sys.stderr)
+                print()
+        finally:
+            await browser.close()
+    print("Done!")
+
 
-    browser.close()
-    print("\nDone!")
+if __name__ == '__main__':
+    # Usage: poc-inspect-searchbox.py [url...]
+    asyncio.run(main(sys.argv[1:] or DEFAULT_URLS))
@@ -624,7 +624,9 @@ QUIET_MODE="${QUIET_MODE:-}"
 
 # Print message only if not in quiet mode
 log_verbose() {
-    [[ -z "$QUIET_MODE" ]] && echo "$@"
+    if [[ -z "$QUIET_MODE" ]]; then
+        echo "$@"
+    fi
 }
 
 # Print progress indicator: [current/total] message
@@ -0,0 +1,814 @@
+#!/usr/bin/env bash
+# Rule Test Utilities
+# Shared functions for testing custom Semgrep rules against their fixtures
+#
+# Usage: source this file in other scripts
+#   source "$SCRIPT_DIR/lib/rule-test-utils.sh"
+
+# Ensure we're not run directly
+if [[ "${BASH_SOURCE[0]}" == "${0}" ]]; then
+    echo "This script should be sourced, not executed directly."
+    echo "Usage: source ${BASH_SOURCE[0]}"
+    exit 1
+fi
+
+# =============================================================================
+# Rule / Fixture Discovery
+# =============================================================================
+
+# List rule files with their test fixtures as TSV: <rule-file>\t<fixture>
+# A fixture shares the rule's basename: foo.yaml -> foo.py, foo.test.py, ...
+# Args: $@ = files or directories to search
+find_rule_tests() {
+    local path rule stem fixture
+
+    for path in "$@"; do
+        if [[ -f "$path" ]]; then
+            echo "$path"
+        elif [[ -d "$path" ]]; then
+            find "$path" -type f \( -name '*.yaml' -o -name '*.yml' \) \
+                -not -path '*/node_modules/*' -not -path '*/.github/*'
+        fi
+    done | sort -u | while IFS= read -r rule; do
+        stem="${rule%.*}"
+        # "$stem".* also covers the foo.test.* fixtures
+        for fixture in "$stem".*; do
+            [[ -f "$fixture" ]] || continue
+            case "$fixture" in
+                *.yaml|*.yml|*.md|*.fixed|*.fixed.*) continue ;;
+            esac
+            printf '%s\t%s\n' "$rule" "$fixture"
+        done
+    done | sort -u
+}
+
+# =============================================================================
+# Literal Prefilter
+# Mirrors semgrep's own rule prefilter: a rule can only match a file that
+# contains at least one identifier from its positive patterns.
+# =============================================================================
+
+# Print the identifiers a file must contain for a rule to possibly match,
+# one per line. A pattern-regex leaf is printed as "re:<regex>" ("rei:" for a
+# leading (?i)) when it means the same as a POSIX ERE; a file matching it
+# also qualifies. Prints "*" if any positive pattern has no usable literal
+# (PCRE-only regex, bare metavariables, keyword-only code) or is written in a
+# form the walker does not read (YAML flow style, match: syntax), and for any
+# rule that yields no literal at all, meaning the rule must always run.
+# A rule that declares metadata.required_literals (a list of identifiers)
+# uses that list instead of the inferred one.
+# Args: $1 = rule YAML file
+#       $2 = optional "--per-rule": print <id>\t<inferred|declared>\t<literal>
+#            rows for every rule instead, plus <id>\tnode\t<path>\t<literals>
+#            rows describing the positive pattern tree (used by lint-rules.sh)
+extract_rule_literals() {
+    local rule="$1"
+    local mode="${2:-}"
+
+    awk -v per_rule="$mode" '
+        BEGIN {
+            # Sections whose patterns never have to match for a finding
+            split("pattern-not pattern-not-inside pattern-not-regex " \
+                  "pattern-sanitizers pattern-propagators metavariable-pattern " \
+                  "metavariable-regex metavariable-comparison focus-metavariable " \
+                  "metadata message fix fix-regex paths options", s, " ")
+            for (i in s) skip_key[s[i]] = 1
+
+            # Keywords appear in nearly every file and prove nothing
+            split("and as assert async await break case catch class const " \
+                  "continue def default defer del elif else except extends " \
+                  "false final finally for from func function global go if " \
+                  "implements import in instanceof interface is lambda let new " \
+                  "nonlocal not null or package pass private protected public " \
+                  "raise range return self static struct switch this throw " \
+                  "throws true try type typeof var void while with yield " \
+                  "None True False", k, " ")
+            for (i in k) keyword[k[i]] = 1
+
+            depth = 0
+            block_indent = -1
+            collect_indent = -1
+            r = 0
+        }
+
+        function in_skipped(   i) {
+            for (i = 1; i <= depth; i++)
+                if (stack_key[i] in skip_key) return 1
+            return 0
+        }
+
+        # True inside a positive pattern operator (pattern-either, patterns,
+        # pattern-sinks, match, ...), where only the block syntax is parsed
+        function in_pattern(   i) {
+            for (i = 1; i <= depth; i++)
+                if (stack_key[i] ~ /^pattern/ || stack_key[i] == "match") return 1
+            return 0
+        }
+
+        # True if a PCRE pattern-regex reads the same as a POSIX ERE run over
+        # the whole file: no escape classes, no (?...) groups except a
+        # leading (?i), no anchors, no escapes inside brackets. The ERE runs
+        # on bytes (LC_ALL=C) while semgrep matches UTF-8 characters, so
+        # anything whose match depends on character width is rejected too:
+        # non-ASCII text, negated brackets and "." other than in .* and .+
+        function portable_regex(re,   rest) {
+            if (re == "" || index(re, "\t") || re ~ /[^ -~]/) return 0
+            if (re ~ /\\[A-Za-z0-9]/ || re ~ /\$/) return 0
+            if (index(re, "[") && index(re, "\\")) return 0
+            if (index(re, "^")) return 0
+            rest = re
+            gsub(/\\./, "", rest)
+            gsub(/\.[*+]/, "", rest)
+            if (index(rest, ".")) return 0
+            return index(re, "(?") == 0
+        }
+
+        # A scalar value without its trailing YAML comment: " #..." after the
+        # closing quote of a quoted scalar, or anywhere in a plain one
+        function strip_comment(value,   i, c) {
+            if (value ~ /^"/) {
+                for (i = 2; i <= length(value); i++) {
+                    c = substr(value, i, 1)
+                    if (c == "\\") i++
+                    else if (c == "\"") break
+                }
+            } else if (value ~ /^\047/) {
+                for (i = 2; i <= length(value); i++) {
+                    if (substr(value, i, 1) != "\047") continue
+                    if (substr(value, i + 1, 1) != "\047") break
+                    i++
+                }
+            } else {
+                sub(/(^|[ \t]+)#.*$/, "", value)
+                return value
+            }
+            if (substr(value, i + 1) ~ /^[ \t]+#/) value = substr(value, 1, i)
+            return value
+        }
+
+        function finish_regex(value,   prefix) {
+            if (value ~ /^".*"$/) {
+                # Double-quoted YAML applies its own escapes first
+                if (index(value, "\\")) { unfilterable[r] = 1; return }
+                value = substr(value, 2, length(value) - 2)
+            } else if (value ~ /^\047.*\047$/) {
+                value = substr(value, 2, length(value) - 2)
+                gsub(/\047\047/, "\047", value)
+            }
+            prefix = "re:"
+            if (substr(value, 1, 4) == "(?i)") {
+                prefix = "rei:"
+                value = substr(value, 5)
+            }
+            if (portable_regex(value)) {
+                inferred[r, prefix value] = 1
+                has_inferred[r] = 1
+            } else unfilterable[r] = 1
+        }
+
+        function finish_leaf(text,   found, tok) {
+            leaf_lits = ""
+            # Drop metavariables and string literals (with f/r/b prefixes)
+            gsub(/\$[A-Z_][A-Z0-9_]*/, " ", text)
+            gsub(/[A-Za-z]?"([^"\\]|\\.)*"/, " ", text)
+            gsub(/[A-Za-z]?\047([^\047\\]|\\.)*\047/, " ", text)
+
+            found = 0
+            while (match(text, /[A-Za-z_][A-Za-z0-9_]*/)) {
+                tok = substr(text, RSTART, RLENGTH)
+                text = substr(text, RSTART + RLENGTH)
+                if (length(tok) < 2 || tok in keyword) continue
+                inferred[r, tok] = 1
+                leaf_lits = leaf_lits " " tok
+                found = 1
+            }
+            if (found) has_inferred[r] = 1
+            else unfilterable[r] = 1
+        }
+
+        function declare(lit) {
+            gsub(/^[ \t"\047]+|[ \t"\047]+$/, "", lit)
+            if (lit == "") return
+            declared[r, lit] = 1
+            has_declared[r] = 1
+            if (lit !~ /^[A-Za-z_][A-Za-z0-9_]*$/) bad_declared[r] = 1
+        }
+
+        {
+            line = $0
+            match(line, /^ */)
+            indent = RLENGTH
+
+            # Block scalar content (pattern: | ... or message: | ...)
+            if (block_indent >= 0) {
+                if (line ~ /^ *$/ || indent > block_indent) {
+                    if (block_leaf) leaf_text = leaf_text "\n" line
+                    next
+                }
+                if (block_leaf) {
+                    finish_leaf(leaf_text)
+                    node_lits[block_node] = leaf_lits
+                }
+                block_indent = -1
+                block_leaf = 0
+            }
+
+            if (line ~ /^ *(#.*)?$/) next
+
+            # Block list under metadata.required_literals
+            if (collect_indent >= 0) {
+                if (match(line, /^ *- +/) && RLENGTH > collect_indent \
+                        && substr(line, RLENGTH + 1) !~ /^[A-Za-z0-9_-]+:( |$)/) {
+                    item = substr(line, RLENGTH + 1)
+                    sub(/ +#.*$/, "", item)
+                    declare(item)
+                    next
+                }
+                collect_indent = -1
+            }
+
+            # "- key: value" list items: the key sits after the dash
+            item = match(line, /^ *- +/)
+            if (item) {
+                indent = RLENGTH
+                line = substr(line, RLENGTH + 1)
+            } else {
+                line = substr(line, indent + 1)
+            }
+
+            while (depth > 0 && stack_indent[depth] >= indent) depth--
+            skipped = in_skipped()
+            if (item) list_item[depth]++
+
+            # Each item of the top-level rules list starts a new rule
+            if (item && depth == 1 && stack_key[1] == "rules") rule_id[++r] = ""
+
+            # Anything but a "key: value" line inside a pattern operator (flow
+            # mappings and sequences, plain list items) cannot be read here
+            if (!match(line, /^[A-Za-z0-9_-]+:( |$)/)) {
+                if (!skipped && in_pattern()) unfilterable[r] = 1
+                next
+            }
+            key = substr(line, 1, RLENGTH)
+            sub(/: ?$/, "", key)
+            value = substr(line, RLENGTH + 1)
+            sub(/^ +/, "", value)
+            sub(/ +$/, "", value)
+
+            if (key == "id" && depth == 1 && stack_key[1] == "rules") {
+                rule_id[r] = value
+                gsub(/^["\047]|["\047]$/, "", rule_id[r])
+            }
+            if (!skipped && !(key in skip_key) && (key == "match" \
+                    || ((key ~ /^pattern/ || in_pattern()) && value ~ /^[[{]/)))
+                unfilterable[r] = 1
+            if (key == "required_literals" && depth > 0 && stack_key[depth] == "metadata") {
+                if (value ~ /^\[/) {
+                    sub(/^\[/, "", value)
+                    sub(/\].*$/, "", value)
+                    n = split(value, items, ",")
+                    for (i = 1; i <= n; i++) declare(items[i])
+                } else if (value == "") {
+                    collect_indent = indent - 1
+                }
+            }
+
+            stack_key[++depth] = key
+            stack_indent[depth] = indent
+
+            # Node path for --per-rule, e.g. /rules/1:pattern-either/2:pattern
+            # ("<n>:" = n-th item of the parent list)
+            item_of = list_item[depth - 1]
+            list_item[depth] = 0
+            node_path[depth] = node_path[depth - 1] "/" (item_of ? item_of ":" : "") key
+            node = 0
+            if (r > 0 && depth > 1 && !skipped && !(key in skip_key)) {
+                node = ++n_node
+                node_rule[node] = r
+                node_at[node] = node_path[depth]
+            }
+
+            is_block = (value ~ /^[|>][-+0-9]*( +#.*)?$/)
+            leaf = !skipped && (key == "pattern" || key == "pattern-regex")
+
+            if (leaf && value ~ /^[[{]/) leaf = 0
+            if (leaf && key == "pattern-regex") {
+                if (is_block) unfilterable[r] = 1
+                else finish_regex(strip_comment(value))
+                leaf = 0
+            }
+
+            if (is_block) {
+                block_indent = indent
+                block_leaf = leaf
+                block_node = node
+                leaf_text = ""
+            } else if (leaf) {
+                value = strip_comment(value)
+                if (value ~ /^".*"$/ || value ~ /^\047.*\047$/)
+                    value = substr(value, 2, length(value) - 2)
+                finish_leaf(value)
+                node_lits[node] = leaf_lits
+            }
+        }
+
+        END {
+            if (block_indent >= 0 && block_leaf) {
+                finish_leaf(leaf_text)
+                node_lits[block_node] = leaf_lits
+            }
+
+            if (per_rule == "--per-rule") {
+                for (entry in inferred) {
+                    split(entry, key_parts, SUBSEP)
+                    print rule_id[key_parts[1]] "\tinferred\t" key_parts[2]
+                }
+                for (i = 0; i <= r; i++)
+                    if (i in unfilterable) print rule_id[i] "\tinferred\t*"
+                for (entry in declared) {
+                    split(entry, key_parts, SUBSEP)
+                    print rule_id[key_parts[1]] "\tdeclared\t" key_parts[2]
+                }
+                for (i = 1; i <= n_node; i++) {
+                    lits = node_lits[i]
+                    sub(/^ /, "", lits)
+                    print rule_id[node_rule[i]] "\tnode\t" node_at[i] "\t" lits
+                }
+                exit
+            }
+
+            # A rule none of whose positive patterns was read cannot be filtered
+            if (r == 0) unfilterable[0] = 1
+            for (i = 1; i <= r; i++)
+                if (!(i in has_inferred) && !(i in has_declared)) unfilterable[i] = 1
+
+            # Declared literals win; any other rule without literals forces "*"
+            for (i = 0; i <= r; i++) {
+                use_declared[i] = (i in has_declared) && !(i in bad_declared)
+                if (!use_declared[i] && (i in unfilterable)) { print "*"; exit }
+            }
+            for (entry in inferred) {
+                split(entry, key_parts, SUBSEP)
+                if (!use_declared[key_parts[1]]) print key_parts[2]
+            }
+            for (entry in declared) {
+                split(entry, key_parts, SUBSEP)
+                if (use_declared[key_parts[1]]) print key_parts[2]
+            }
+        }
+    ' "$rule" | sort -u
+}
+
+# Build the prefilter table for a set of rules, once per run.
+# Writes <rule>\t<literal> rows (literal "*" = always run) to $2.
+# Args: $1 = file listing rule paths, $2 = output TSV
+build_prefilter() {
+    local rules_file="$1"
+    local output="$2"
+    local rule
+
+    : > "$output"
+    while IFS= read -r rule; do
+        [[ -n "$rule" ]] || continue
+        extract_rule_literals "$rule" | while IFS= read -r literal; do
+            printf '%s\t%s\n' "$rule" "$literal"
+        done >> "$output"
+    done < "$rules_file"
+}
+
+# Keep only the (rule, fixture) pairs whose fixture contains at least one
+# of the rule's required literals. All literals from every rule are matched
+# in a single grep -F pass (Aho-Corasick) over every fixture. Each rule's
+# pattern-regex expressions are compiled together into one grep -E
+# automaton and run once over that rule's fixtures.
+# Args: $1 = pairs TSV (<rule>\t<fixture>), $2 = prefilter TSV from
+#       build_prefilter, $3 = output TSV of pairs that must run
+prefilter_rule_tests() {
+    local pairs="$1"
+    local prefilter="$2"
+    local output="$3"
+    local patterns hits regexes regex_hits rule flags
+
+    patterns=$(mktemp)
+    hits=$(mktemp)
+    regexes=$(mktemp)
+    regex_hits=$(mktemp)
+
+    cut -f2 "$prefilter" | grep -vxE '\*|rei?:.*' | sort -u > "$patterns" || true
+
+    if [[ -s "$patterns" ]]; then
+        cut -f2 "$pairs" | sort -u | tr '\n' '\0' \
+            | LC_ALL=C xargs -0 grep -HowF -f "$patterns" -- 2>/dev/null \
+            | sort -u > "$hits" || true
+    fi
+
+    # -z reads each fixture as one record, like semgrep matching the whole file
+    while IFS=$'\t' read -r rule flags; do
+        awk -F'\t' -v rule="$rule" -v p="re${flags:+i}:" \
+            '$1 == rule && index($2, p) == 1 { print substr($2, length(p) + 1) }' \
+            "$prefilter" > "$regexes"
+        # An expression grep rejects (exit 2) must not prefilter anything out
+        if LC_ALL=C grep -qE -f "$regexes" /dev/null 2>/dev/null || [[ $? -eq 1 ]]; then
+            awk -F'\t' -v rule="$rule" '$1 == rule { printf "%s%c", $2, 0 }' "$pairs" \
+                | LC_ALL=C xargs -0 grep -lzE ${flags:+"$flags"} -f "$regexes" -- 2>/dev/null \
+                | awk -v rule="$rule" '{ print rule "\t" $0 }' >> "$regex_hits" || true
+        else
+            awk -F'\t' -v rule="$rule" '$1 == rule' "$pairs" >> "$regex_hits"
+        fi
+    done < <(awk -F'\t' '$2 ~ /^re:/ { print $1 "\t" } $2 ~ /^rei:/ { print $1 "\t-i" }' "$prefilter" | sort -u)
+
+    awk -F'\t' -v prefilter="$prefilter" -v hits="$hits" -v regex_hits="$regex_hits" '
+        BEGIN {
+            while ((getline row < prefilter) > 0) {
+                split(row, f, "\t")
+                if (f[2] == "*") always[f[1]] = 1
+                else if (f[2] !~ /^rei?:/) needs[f[1]] = needs[f[1]] "\t" f[2]
+            }
+            while ((getline row < regex_hits) > 0) {
+                split(row, f, "\t")
+                regex_hit[f[1], f[2]] = 1
+            }
+            while ((getline row < hits) > 0) {
+                # grep -H prints <file>:<literal>; literals never contain ":"
+                n = split(row, h, ":")
+                file = substr(row, 1, length(row) - length(h[n]) - 1)
+                hit[file, h[n]] = 1
+            }
+        }
+        {
+            rule = $1; fixture = $2
+            if ((rule in always) || ((rule, fixture) in regex_hit)) { print; next }
+            n = split(needs[rule], lits, "\t")
+            for (i = 2; i <= n; i++) {
+                if ((fixture, lits[i]) in hit) { print; next }
+            }
+        }
+    ' "$pairs" > "$output"
+
+    rm -f "$patterns" "$hits" "$regexes" "$regex_hits"
+}
+
+# =============================================================================
+# Test Annotations
+# Same conventions as semgrep --test: a "# ruleid: <id>" comment on its own
+# line N expects the finding on line N + 1, whatever that line holds (blank
+# lines and further annotations are not skipped); a trailing one applies to
+# its own line.
+#   ruleid      finding expected        ok      finding must not appear
+#   todoruleid  known false negative    todook  known false positive
+# =============================================================================
+
+# Print the rule ids defined in a rule file, one per line
+# Args: $1 = rule YAML file
+extract_rule_ids() {
+    sed -nE "s/^[[:space:]]*-[[:space:]]+id:[[:space:]]*[\"']?([^\"'[:space:]]+).*/\1/p" "$1"
+}
+
+# Print annotations for any number of fixtures as TSV:
+#   <fixture>\t<line>\t<kind>\t<rule-id>
+# All fixtures are read in one awk pass, comparing raw bytes in the C locale.
+# A plain substring check on the "ruleid:" / "ok:" literals (which also cover
+# the todo* forms) gates the regex, so ordinary code lines never reach the
+# regex engine.
+# Args: $@ = fixture files
+extract_annotations() {
+    [[ $# -gt 0 ]] || return 0
+
+    LC_ALL=C awk '
+        {
+            if (!(index($0, "ruleid:") || index($0, "ok:")) \
+                    || !match($0, /(#|\/\/|\/\*|<!--|\(\*|--)[ \t]*(todoruleid|todook|ruleid|ok):/))
+                next
+
+            code = substr($0, 1, RSTART - 1)
+            text = substr($0, RSTART, RLENGTH)
+            ids = substr($0, RSTART + RLENGTH)
+            sub(/:$/, "", text)
+            sub(/^.*[ \t(*\/#<!-]/, "", text)
+            kind = text
+            sub(/(\*\/|-->|\*\)).*$/, "", ids)
+
+            n = split(ids, list, ",")
+            for (i = 1; i <= n; i++) {
+                id = list[i]
+                gsub(/^[ \t]+|[ \t]+$/, "", id)
+                if (id == "") continue
+                print FILENAME "\t" (code ~ /^[ \t]*$/ ? FNR + 1 : FNR) "\t" kind "\t" id
+            }
+        }
+    ' "$@"
+}
+
+# Validate a semgrep JSON report and flatten it to TSV in the same jq pass:
+#   error\t<rule_id>\t<type>\t<message>  (one per error-level semgrep error;
+#                                        rule_id is empty unless the error
+#                                        is confined to one rule)
+#   finding\t<path>\t<line>\t<check_id>  (one per result)
+# Fails, printing nothing useful, unless the report parses whole and has a
+# results key.
+# Args: $1 = semgrep JSON output
+semgrep_json_rows() {
+    jq -r 'if has("results") then . else error("no results key") end
+        | (.errors[]? | select(.level == "error")
+            | ["error", (.rule_id // ""), (.type | tostring), (.message // .type | tostring)]),
+          (.results[] | ["finding", .path, .start.line, .check_id])
+        | @tsv' "$1"
+}
+
+# Compare semgrep JSON output against fixture annotations, one verdict per
+# (rule, fixture) pair: <rule>\t<fixture>\t<PASS|FAIL>\t<details>
+# Rule ids and pairs are interned to integers up front; awk streams the
+# annotations and findings out as <pair>\t<id>\t<line> integer keys, and the
+# set arithmetic (missed = expected - reported, unexpected = reported -
+# expected - tolerated) runs over all pairs at once in sort/comm. Names are
+# only looked up again for failure details. A rule semgrep rejected (an
+# error row with a rule_id) fails every pair of the rule file defining it.
+# Args: $1 = pairs TSV, $2 = rule ids TSV (<rule>\t<id>),
+#       $3 = annotations TSV from extract_annotations,
+#       $4... = report rows from semgrep_json_rows
+check_rule_tests() (
+    local pairs="$1"
+    local ids="$2"
+    local annotations="$3"
+    shift 3
+    local tmp
+
+    # Runs in a subshell so the scratch dir goes away even if a step fails under -e
+    tmp=$(mktemp -d)
+    trap 'rm -rf "$tmp"' EXIT
+    awk -F'\t' -v OFS='\t' '$1 == "finding" { print $2, $3, $4 }' "$@" > "$tmp/findings"
+    awk -F'\t' -v OFS='\t' '$1 == "error" && $2 != "" { print $2, $3 }' "$@" > "$tmp/rule_errors"
+
+    awk -F'\t' -v pairs="$pairs" -v ids="$ids" -v findings="$tmp/findings" \
+            -v rule_errors="$tmp/rule_errors" -v out="$tmp" '
+        # semgrep prefixes check ids with the config path; resolve each
+        # distinct check_id once to the definitions whose dotted rule
+        # directory ends in that prefix, so an id defined in rule files of
+        # two directories is only charged to the one that reported it
+        function resolve(check_id,   matches, d, id, prefix, dotted) {
+            if (check_id in resolved) return resolved[check_id]
+            matches = ""
+            for (d = 1; d <= n_def; d++) {
+                id = id_name[def_id[d]]
+                if (check_id == id) {
+                    matches = matches " " d
+                    continue
+                }
+                prefix = substr(check_id, 1, length(check_id) - length(id) - 1)
+                if (substr(check_id, length(prefix) + 1) != "." id || prefix == "") continue
+                dotted = def_dotted[d]
+                if (dotted == prefix || substr(dotted, length(dotted) - length(prefix)) == "." prefix)
+                    matches = matches " " d
+            }
+            return resolved[check_id] = matches
+        }
+
+        BEGIN {
+            # Intern table: rule id string -> integer, shared by all rules
+            n_id = 0
+            n_def = 0
+            while ((getline row < ids) > 0) {
+                split(row, f, "\t")
+                if (!(f[2] in id_num)) {
+                    id_num[f[2]] = ++n_id
+                    id_name[n_id] = f[2]
+                    print n_id "\t" f[2] > (out "/id_names")
+                }
+                rule_has[f[1], id_num[f[2]]] = 1
+
+                # Each definition of an id, with the directory of its rule file
+                # in the dotted form semgrep prefixes check ids with
+                # (custom-rules/web-vulns/x.yaml -> custom-rules.web-vulns)
+                def_rule[++n_def] = f[1]
+                def_id[n_def] = id_num[f[2]]
+                dotted = f[1]
+                if (!sub(/\/[^\/]*$/, "", dotted)) dotted = ""
+                gsub(/\//, ".", dotted)
+                sub(/^\.+/, "", dotted)
+                def_dotted[n_def] = dotted
+            }
+            n_pair = 0
+            while ((getline row < pairs) > 0) {
+                split(row, f, "\t")
+                pair_rule[++n_pair] = f[1]
+                fixture_pairs[f[2]] = fixture_pairs[f[2]] " " n_pair
+                rule_pairs[f[1]] = rule_pairs[f[1]] " " n_pair
+            }
+        }
+
+        FILENAME == rule_errors {
+            m = split(resolve($1), dlist, " ")
+            for (k = 1; k <= m; k++) {
+                n = split(rule_pairs[def_rule[dlist[k]]], plist, " ")
+                for (p = 1; p <= n; p++)
+                    print plist[p] "\t" def_id[dlist[k]] "\t" $2 > (out "/rejected")
+            }
+            next
+        }
+
+        FILENAME != findings {
+            if (!($4 in id_num)) next
+            rid = id_num[$4]
+            n = split(fixture_pairs[$1], plist, " ")
+            for (p = 1; p <= n; p++) {
+                if (!((pair_rule[plist[p]], rid) in rule_has)) continue
+                if ($3 == "ruleid") print plist[p] "\t" rid "\t" $2 > (out "/expected")
+                else if ($3 ~ /^todo/) print plist[p] "\t" rid "\t" $2 > (out "/tolerated")
+            }
+            next
+        }
+
+        {
+            n = split(fixture_pairs[$1], plist, " ")
+            m = split(resolve($3), dlist, " ")
+            for (p = 1; p <= n; p++)
+                for (k = 1; k <= m; k++)
+                    if (pair_rule[plist[p]] == def_rule[dlist[k]])
+                        print plist[p] "\t" def_id[dlist[k]] "\t" $2 > (out "/reported")
+        }
+    ' "$annotations" "$tmp/findings" "$tmp/rule_errors"
+
+    local set
+    for set in id_names expected tolerated reported rejected; do
+        touch "$tmp/$set"
+        LC_ALL=C sort -u -o "$tmp/$set" "$tmp/$set"
+    done
+
+    {
+        LC_ALL=C comm -23 "$tmp/expected" "$tmp/reported" | sed 's/^/missed\t/'
+        LC_ALL=C comm -23 "$tmp/reported" "$tmp/expected" \
+            | LC_ALL=C comm -23 - "$tmp/tolerated" | sed 's/^/unexpected\t/'
+    } | LC_ALL=C sort -t$'\t' -k2,2n -k1,1 -k4,4n > "$tmp/details"
+
+    # Details per pair: rejected rules, then missed before unexpected, each
+    # in file order
+    awk -F'\t' -v id_names="$tmp/id_names" -v rejected="$tmp/rejected" \
+            -v details_file="$tmp/details" '
+        FILENAME == id_names { id_name[$1] = $2; next }
+        FILENAME == rejected {
+            details[$1] = details[$1] ", rejected " id_name[$2] " (" $3 ")"
+            next
+        }
+        FILENAME == details_file {
+            details[$2] = details[$2] ", " $1 " " id_name[$3] ":" $4
+            next
+        }
+        {
+            d = details[FNR]
+            print $1 "\t" $2 "\t" (d == "" ? "PASS" : "FAIL") "\t" substr(d, 3)
+        }
+    ' "$tmp/id_names" "$tmp/rejected" "$tmp/details" "$pairs"
+)
+
+# =============================================================================
+# Result Cache
+# Content-addressed: a rule test only re-runs when the rule, the fixture,
+# the semgrep build or the verdict logic changes.
+# =============================================================================
+
+RULE_TEST_CACHE_DIR="${RULE_TEST_CACHE_DIR:-$HOME/.semgrep/cache/rule-tests}"
+
+# Version of the verdict logic (annotation parsing, check_rule_tests, the
+# prefiltered join in test-rules.sh). It is part of every cache key: bump it
+# whenever a change could turn a cached PASS into a FAIL.
+RULE_TEST_ORACLE_VERSION=5
+
+# Print the SHA-256 of stdin (sha256sum on Linux, shasum on macOS)
+sha256_stdin() {
+    if command -v sha256sum &> /dev/null; then
+        sha256sum | cut -d' ' -f1
+    else
+        shasum -a 256 | cut -d' ' -f1
+    fi
+}
+
+# Print the cache key for a rule test: oracle version, semgrep version,
+# fixture extension, rule and fixture content
+# Args: $1 = rule file, $2 = fixture file, $3 = semgrep version string
+rule_test_cache_key() {
+    local rule="$1"
+    local fixture="$2"
+    local version="$3"
+
+    {
+        printf '%s\0%s\0%s\0' "$RULE_TEST_ORACLE_VERSION" "$version" "${fixture##*.}"
+        cat "$rule"
+        printf '\0'
+        cat "$fixture"
+    } | sha256_stdin
+}
+
+# Check whether a rule test already passed with identical inputs
+# Args: $1 = cache key
+rule_test_cached() {
+    [[ -f "$RULE_TEST_CACHE_DIR/${1:0:2}/$1.pass" ]]
+}
+
+# Record a passing rule test
+# Args: $1 = cache key
+rule_test_cache_store() {
+    mkdir -p "$RULE_TEST_CACHE_DIR/${1:0:2}"
+    : > "$RULE_TEST_CACHE_DIR/${1:0:2}/$1.pass"
+}
+
+# =============================================================================
+# Parallel Execution
+# Rule tests are independent, so large runs are split across several semgrep
+# processes. Shards are balanced by fixture bytes, the dominant cost.
+# =============================================================================
+
+# Print the number of CPU cores (macOS and Linux)
+detect_cpu_count() {
+    sysctl -n hw.physicalcpu 2>/dev/null || nproc 2>/dev/null || echo 1
+}
+
+# Split rule test pairs into at most $2 shards of roughly equal fixture bytes.
+# A single semgrep process runs every rule it is given over every target it
+# is given, so pairs are first grouped into connected components (fixtures
+# sharing a rule, rules sharing a fixture) and components are never split:
+# each shard then only pays for rule/fixture combinations its own pairs
+# need. Greedy bin packing: the heaviest remaining component goes to the
+# lightest shard.
+# Writes $3/shard.<n>.tsv files and prints their paths.
+# Args: $1 = pairs TSV, $2 = number of shards, $3 = output directory
+shard_rule_tests() {
+    local pairs="$1"
+    local jobs="$2"
+    local outdir="$3"
+    local sizes fixture size
+
+    # A single shard is the whole input; nothing to group or balance
+    if [[ "$jobs" -le 1 ]]; then
+        cp "$pairs" "$outdir/shard.1.tsv"
+        echo "$outdir/shard.1.tsv"
+        return
+    fi
+
+    sizes=$(mktemp)
+    cut -f2 "$pairs" | sort -u | while IFS= read -r fixture; do
+        size=$(stat -f%z "$fixture" 2>/dev/null || stat -c%s "$fixture" 2>/dev/null || echo "0")
+        printf '%s\t%s\n' "$fixture" "$size"
+    done > "$sizes"
+
+    awk -F'\t' -v jobs="$jobs" -v sizes="$sizes" -v outdir="$outdir" '
+        function find(x) {
+            while (parent[x] != x) {
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            }
+            return x
+        }
+
+        BEGIN {
+            while ((getline row < sizes) > 0) {
+                split(row, f, "\t")
+                size[f[1]] = f[2]
+            }
+        }
+
+        {
+            row_of[++n] = $0
+            fixture_of[n] = $2
+            r = "r" SUBSEP $1
+            x = "f" SUBSEP $2
+            if (!(r in parent)) parent[r] = r
+            if (!(x in parent)) parent[x] = x
+            a = find(r); b = find(x)
+            if (a != b) parent[a] = b
+        }
+
+        END {
+            # Component weight = bytes of its fixtures; list roots heaviest first
+            n_comp = 0
+            for (i = 1; i <= n; i++) {
+                root = find("f" SUBSEP fixture_of[i])
+                comp_of[i] = root
+                if (!(root in weight)) comp[++n_comp] = root
+                if (!(fixture_of[i] in weighed)) {
+                    weighed[fixture_of[i]] = 1
+                    weight[root] += size[fixture_of[i]]
+                }
+            }
+            for (i = 2; i <= n_comp; i++) {
+                c = comp[i]
+                for (j = i - 1; j >= 1 && weight[comp[j]] < weight[c]; j--) comp[j + 1] = comp[j]
+                comp[j + 1] = c
+            }
+
+            for (i = 1; i <= n_comp; i++) {
+                best = 1
+                for (s = 2; s <= jobs; s++) if (load[s] < load[best]) best = s
+                load[best] += weight[comp[i]]
+                shard_of[comp[i]] = best
+            }
+
+            for (i = 1; i <= n; i++) {
+                file = outdir "/shard." shard_of[comp_of[i]] ".tsv"
+                if (!(file in used)) { used[file] = 1; print file }
+                print row_of[i] > file
+            }
+        }
+    ' "$pairs"
+
+    rm -f "$sizes"
+}
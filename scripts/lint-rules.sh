@@ -0,0 +1,179 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Rule Linter - check metadata.required_literals against the rule patterns
+#
+# Rules may declare the identifiers a file must contain for them to match:
+#
+#   metadata:
+#     required_literals: [yaml]
+#
+# test-rules.sh prefilters with the declared list instead of the inferred
+# one. This script re-runs the inference and reports divergence:
+# - ERROR: a declared literal is not an identifier (it is ignored)
+# - WARN:  a declared literal appears in none of the rule's positive patterns
+# - WARN:  some alternative of the rule (a pattern-either branch, a taint
+#          source or sink list, ...) contains none of the declared literals,
+#          so the prefilter may skip files the rule would match
+# Exit code 1 if any ERROR is found.
+
+usage() {
+    echo "Usage: $0 [path...] [-v|--verbose]"
+    echo "Check declared required_literals of custom rules against their patterns."
+    echo ""
+    echo "Arguments:"
+    echo "  path                  Rule files or directories (default: custom-rules/{custom,cve,patterns,web-vulns})"
+    echo ""
+    echo "Options:"
+    echo "  -v, --verbose         Also list undeclared inferred literals of rules whose"
+    echo "                        declaration covers every alternative"
+}
+
+PATHS=()
+VERBOSE=""
+
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        -h|--help)
+            usage
+            exit 0
+            ;;
+        -v|--verbose)
+            VERBOSE="1"
+            shift
+            ;;
+        -*)
+            echo "Error: Unknown option: $1"
+            usage
+            exit 1
+            ;;
+        *)
+            PATHS+=("$1")
+            shift
+            ;;
+    esac
+done
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$SCRIPT_DIR/lib/catalog-utils.sh"
+source "$SCRIPT_DIR/lib/rule-test-utils.sh"
+
+if [[ ${#PATHS[@]} -eq 0 ]]; then
+    for dir in custom cve patterns web-vulns; do
+        [[ -d "$CATALOG_ROOT/custom-rules/$dir" ]] && PATHS+=("$CATALOG_ROOT/custom-rules/$dir")
+    done
+fi
+
+errors=0
+warnings=0
+declaring=0
+
+while IFS= read -r rule; do
+    rows=$(extract_rule_literals "$rule" --per-rule)
+    grep -q $'\tdeclared\t' <<< "$rows" || continue
+
+    report=$(awk -F'\t' -v file="${rule#"$CATALOG_ROOT"/}" -v verbose="$VERBOSE" '
+        function last_segment(path) {
+            sub(/^.*\//, "", path)
+            return path
+        }
+
+        # List item number of a node within its parent ("2:pattern" -> 2)
+        function item_of(path) {
+            path = last_segment(path)
+            return (path ~ /^[0-9]+:/) ? path + 0 : 0
+        }
+
+        function key_of(path) {
+            path = last_segment(path)
+            sub(/^[0-9]+:/, "", path)
+            return path
+        }
+
+        # A pattern leaf is covered if it contains a declared literal: any
+        # file it matches then contains that literal
+        function leaf_covered(id, path,   n, lit, i) {
+            n = split(lits[path], lit, " ")
+            for (i = 1; i <= n; i++)
+                if ((id, lit[i]) in declared) return 1
+            return 0
+        }
+
+        # The keys of one mapping all have to match, so one covered key covers it
+        function mapping_covered(id, parent, item,   n, child, i) {
+            n = split(children[parent], child, "\n")
+            for (i = 2; i <= n; i++)
+                if (item_of(child[i]) == item && node_covered(id, child[i])) return 1
+            return 0
+        }
+
+        # patterns: needs every item, so one covered item is enough;
+        # pattern-either and taint source/sink lists match on any item, so
+        # every item must be covered. Other operators are never covered.
+        function node_covered(id, path,   key, n, child, i, item, seen, any, all) {
+            key = key_of(path)
+            if (key == "pattern") return leaf_covered(id, path)
+            if (key != "patterns" && key !~ /^pattern-(either|sources|sinks)$/) return 0
+
+            any = 0
+            all = 1
+            n = split(children[path], child, "\n")
+            for (i = 2; i <= n; i++) {
+                item = item_of(child[i])
+                if (item == 0 || (item in seen)) continue
+                seen[item] = 1
+                if (mapping_covered(id, path, item)) any = 1
+                else all = 0
+            }
+            return (key == "patterns") ? any : (any && all)
+        }
+
+        $2 == "inferred" { inferred[$1, $3] = 1; if ($3 == "*") wildcard[$1] = 1; next }
+        $2 == "node" {
+            lits[$3] = $4
+            parent = $3
+            sub(/\/[^\/]*$/, "", parent)
+            children[parent] = children[parent] "\n" $3
+            if (parent == "/rules") rule_item[$1] = item_of($3)
+            next
+        }
+        { declared[$1, $3] = 1; ids[$1] = 1 }
+        END {
+            for (entry in declared) {
+                split(entry, p, SUBSEP)
+                if (p[2] !~ /^[A-Za-z_][A-Za-z0-9_]*$/)
+                    print "ERROR\t" file " (" p[1] "): required literal \"" p[2] "\" is not an identifier"
+                else if (!((p[1], p[2]) in inferred))
+                    print "WARN\t" file " (" p[1] "): required literal \"" p[2] "\" is not in any positive pattern"
+            }
+            for (entry in inferred) {
+                split(entry, p, SUBSEP)
+                if ((p[1] in ids) && p[2] != "*" && !((p[1], p[2]) in declared))
+                    undeclared[p[1]] = undeclared[p[1]] ", " p[2]
+            }
+            for (id in ids) {
+                print "RULE\t" id
+                if (!mapping_covered(id, "/rules", rule_item[id]))
+                    print "WARN\t" file " (" id "): required_literals do not cover every alternative" \
+                        (id in undeclared ? "; undeclared: " substr(undeclared[id], 3) : "")
+                else if (verbose && (id in undeclared))
+                    print "INFO\t" file " (" id "): inferred literals not declared: " substr(undeclared[id], 3)
+            }
+        }
+    ' <<< "$rows" | sort)
+
+    while IFS=$'\t' read -r level message; do
+        case "$level" in
+            RULE)  declaring=$((declaring + 1)) ;;
+            ERROR) errors=$((errors + 1)); echo "ERROR: $message" ;;
+            WARN)  warnings=$((warnings + 1)); echo "WARN:  $message" ;;
+            INFO)  echo "INFO:  $message" ;;
+        esac
+    done <<< "$report"
+done < <(find "${PATHS[@]}" -type f \( -name '*.yaml' -o -name '*.yml' \) | sort)
+
+log_summary "Rule lint: $declaring rules declare required_literals, $errors errors, $warnings warnings"
+
+if [[ "$errors" -gt 0 ]]; then
+    exit 1
+fi
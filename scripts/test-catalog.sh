@@ -219,6 +219,94 @@ test_phase_9_14() {
         './scripts/catalog-query.sh --type github --format orgs --limit 5 2>&1 | grep -q "[A-Za-z]" && echo PASS'
 }
 
+# Rule Test Harness
+test_rules() {
+    echo ""
+    echo "Rule Test Harness"
+    echo "----------------------------------------"
+
+    run_test "rule-test-utils.sh sources cleanly" \
+        'source scripts/lib/rule-test-utils.sh && echo PASS'
+
+    run_test "test-rules.sh --help" \
+        './scripts/test-rules.sh --help 2>&1 | grep -q Usage && echo PASS'
+
+    run_test "find_rule_tests pairs rule with fixtures" \
+        'source scripts/lib/rule-test-utils.sh; [[ $(find_rule_tests custom-rules/web-vulns/xpath-injection.yaml | wc -l) -eq 3 ]] && echo PASS'
+
+    run_test "extract_rule_literals finds sink identifiers" \
+        'source scripts/lib/rule-test-utils.sh; extract_rule_literals custom-rules/custom/novel-vulns/python-unsafe-yaml-load.yaml | grep -qx yaml && echo PASS'
+
+    run_test "extract_rule_literals ignores propagators" \
+        'source scripts/lib/rule-test-utils.sh; ! extract_rule_literals custom-rules/web-vulns/python-dynamic-import-lfi.yaml | grep -qx "\\*" && echo PASS'
+
+    run_test "extract_rule_literals keeps portable pattern-regex" \
+        'source scripts/lib/rule-test-utils.sh; extract_rule_literals custom-rules/0xdea-semgrep-rules/rules/generic/bad-words.yaml | grep -qx "rei:(password|private|token|secret)" && echo PASS'
+
+    run_test "extract_rule_literals gives up on character-width pattern-regex" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; for re in "pass.word" "a[^b]c" "pass\303\251"; do printf "rules:\n  - id: r\n    pattern-regex: $re\n" > "$d/r.yaml"; [[ $(extract_rule_literals "$d/r.yaml") == "*" ]] || exit 1; done; echo PASS'
+
+    run_test "extract_rule_literals reads pattern-regex without its trailing comment" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; printf "rules:\n  - id: r\n    pattern-regex: \047%s\047  # HFS macro syntax\n" "\\{\\..*\\.\\}" > "$d/r.yaml"; [[ $(extract_rule_literals scripts/testdata/prefilter/trailing-comment-regex.yaml) == re:secret_key && $(extract_rule_literals "$d/r.yaml") == "re:\\{\\..*\\.\\}" ]] && echo PASS'
+
+    run_test "extract_rule_literals prefers declared required_literals" \
+        'source scripts/lib/rule-test-utils.sh; [[ $(extract_rule_literals custom-rules/custom/novel-vulns/python-unsafe-yaml-load.yaml) == yaml ]] && echo PASS'
+
+    run_test "extract_rule_literals ignores trailing YAML comments" \
+        'source scripts/lib/rule-test-utils.sh; [[ $(extract_rule_literals scripts/testdata/prefilter/trailing-comment.yaml) == evalx ]] && echo PASS'
+
+    run_test "prefilter keeps every pair in scripts/testdata/prefilter" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; find_rule_tests scripts/testdata/prefilter > "$d/pairs"; cut -f1 "$d/pairs" | sort -u > "$d/rules"; build_prefilter "$d/rules" "$d/pf"; prefilter_rule_tests "$d/pairs" "$d/pf" "$d/run"; [[ $(wc -l < "$d/pairs") -eq 4 ]] && diff -q "$d/pairs" "$d/run" > /dev/null && echo PASS'
+
+    run_test "lint-rules.sh finds no errors" \
+        './scripts/lint-rules.sh > /dev/null && echo PASS'
+
+    run_test "lint-rules.sh warns when required_literals drop a branch" \
+        './scripts/lint-rules.sh scripts/testdata/lint | grep -q "^WARN: .*(dropped-branch): required_literals do not cover every alternative" && echo PASS'
+
+    run_test "prefilter drops pair without required literal" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; printf "%s\t%s\n" custom-rules/patterns/traversal/symlink-follow.yaml custom-rules/web-vulns/xpath-injection.test.py > "$d/pairs"; echo custom-rules/patterns/traversal/symlink-follow.yaml > "$d/rules"; build_prefilter "$d/rules" "$d/pf"; prefilter_rule_tests "$d/pairs" "$d/pf" "$d/run"; [[ ! -s "$d/run" ]] && echo PASS'
+
+    run_test "cache key depends on semgrep version" \
+        'source scripts/lib/rule-test-utils.sh; r=custom-rules/web-vulns/xpath-injection.yaml; f=custom-rules/web-vulns/xpath-injection.test.py; [[ $(rule_test_cache_key $r $f 1.0) == $(rule_test_cache_key $r $f 1.0) && $(rule_test_cache_key $r $f 1.0) != $(rule_test_cache_key $r $f 1.1) ]] && echo PASS'
+
+    run_test "rule_test_cache_key changes with the oracle version" \
+        'source scripts/lib/rule-test-utils.sh; r=custom-rules/web-vulns/xpath-injection.yaml; f=custom-rules/web-vulns/xpath-injection.test.py; k=$(rule_test_cache_key $r $f 1.0); RULE_TEST_ORACLE_VERSION=$((RULE_TEST_ORACLE_VERSION + 1)); [[ $(rule_test_cache_key $r $f 1.0) != "$k" ]] && echo PASS'
+
+    run_test "extract_annotations targets the line after an own-line annotation" \
+        'source scripts/lib/rule-test-utils.sh; extract_annotations custom-rules/patterns/traversal/symlink-follow.test.py | grep -q "	10	ruleid	python-archive-extractall-no-filter$" && echo PASS'
+
+    run_test "semgrep_json_rows rejects truncated reports and reports without results" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; jq -n "{errors: [], results: [{check_id: \"x\", path: \"f\", start: {line: 1}}]}" > "$d/ok.json"; head -c 20 "$d/ok.json" > "$d/cut.json"; echo "{\"errors\": []}" > "$d/none.json"; semgrep_json_rows "$d/ok.json" > /dev/null && ! semgrep_json_rows "$d/cut.json" > /dev/null 2>&1 && ! semgrep_json_rows "$d/none.json" > /dev/null 2>&1 && echo PASS'
+
+    run_test "check_rule_tests reports missed and unexpected findings" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; r=custom-rules/patterns/traversal/symlink-follow.yaml; f=custom-rules/patterns/traversal/symlink-follow.test.py; printf "%s\t%s\n" $r $f > "$d/pairs"; extract_rule_ids $r | sed "s|^|$r	|" > "$d/ids"; printf "%s\t10\truleid\tpython-archive-extractall-no-filter\n" $f > "$d/ann"; jq -n "{results: [{check_id: \"custom-rules.patterns.traversal.python-archive-extractall-no-filter\", path: \"$f\", start: {line: 12}}]}" > "$d/out.json"; semgrep_json_rows "$d/out.json" > "$d/rows"; check_rule_tests "$d/pairs" "$d/ids" "$d/ann" "$d/rows" | grep -q "FAIL	missed python-archive-extractall-no-filter:10, unexpected python-archive-extractall-no-filter:12" && echo PASS'
+
+    run_test "check_rule_tests charges a finding only to the rule file that reported it" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; mkdir "$d/a" "$d/b"; f=custom-rules/patterns/traversal/symlink-follow.test.py; for r in "$d/a/x.yaml" "$d/b/x.yaml"; do printf "rules:\n  - id: dup\n" > "$r"; printf "%s\t%s\n" "$r" $f >> "$d/pairs"; printf "%s\tdup\n" "$r" >> "$d/ids"; done; printf "%s\t3\truleid\tdup\n" $f > "$d/ann"; jq -n --arg c "$(echo "${d#/}" | tr / .).a.dup" --arg f $f "{results: [{check_id: \$c, path: \$f, start: {line: 3}}]}" > "$d/out.json"; semgrep_json_rows "$d/out.json" > "$d/rows"; [[ $(check_rule_tests "$d/pairs" "$d/ids" "$d/ann" "$d/rows" | cut -f3 | tr "\n" " ") == "PASS FAIL " ]] && echo PASS'
+
+    run_test "check_rule_tests fails only the rule file of a rule semgrep rejected" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; mkdir "$d/a" "$d/b"; f=custom-rules/patterns/traversal/symlink-follow.test.py; printf "%s\t%s\n" "$d/a/x.yaml" $f "$d/b/y.yaml" $f > "$d/pairs"; printf "%s\tbad\n%s\tgood\n" "$d/a/x.yaml" "$d/b/y.yaml" > "$d/ids"; printf "%s\t3\truleid\tgood\n" $f > "$d/ann"; p=$(echo "${d#/}" | tr / .); jq -n --arg e "$p.a.bad" --arg c "$p.b.good" --arg f $f "{errors: [{level: \"error\", type: \"Rule parse error\", rule_id: \$e, message: \"m\"}], results: [{check_id: \$c, path: \$f, start: {line: 3}}]}" > "$d/out.json"; semgrep_json_rows "$d/out.json" > "$d/rows"; check_rule_tests "$d/pairs" "$d/ids" "$d/ann" "$d/rows" > "$d/v"; [[ $(cut -f3 "$d/v" | tr "\n" " ") == "FAIL PASS " ]] && grep -q "FAIL.rejected bad (Rule parse error)$" "$d/v" && echo PASS'
+
+    run_test "test-rules.sh passes the traversal rules end to end" \
+        'command -v semgrep >/dev/null || { echo SKIP; exit 0; }; ./scripts/test-rules.sh --no-cache custom-rules/patterns/traversal > /dev/null && echo PASS'
+
+    run_test "test-rules.sh reports verdicts for the web-vulns rules end to end" \
+        'command -v semgrep >/dev/null || { echo SKIP; exit 0; }; out=$(./scripts/test-rules.sh --no-cache custom-rules/web-vulns 2>&1); grep -q "^Rule tests: " <<< "$out" && ! grep -q "^Error: semgrep failed" <<< "$out" && echo PASS'
+
+    run_test "test-rules.sh fails a prefiltered pair only on its own rule ids" \
+        'd=$(mktemp -d); trap "rm -rf $d" EXIT; printf "rules:\n  - id: evalx-call\n    languages: [python]\n    severity: INFO\n    message: m\n    pattern: evalx(\$X)\n" > "$d/r.yaml"; printf "# ruleid: other-rule\nprint(1)\n" > "$d/r.py"; SEMGREP_BIN=scripts/testdata/semgrep/invalid-rule ./scripts/test-rules.sh --no-cache "$d/r.yaml" | grep -q "0 failed, 1 prefiltered" && printf "# ruleid: evalx-call\nprint(1)\n" > "$d/r.py" && ! SEMGREP_BIN=scripts/testdata/semgrep/invalid-rule ./scripts/test-rules.sh --no-cache "$d/r.yaml" > /dev/null && echo PASS'
+
+    run_test "test-rules.sh fails the run when semgrep reports an invalid rule" \
+        'out=$(SEMGREP_BIN=scripts/testdata/semgrep/invalid-rule ./scripts/test-rules.sh --no-cache custom-rules/patterns/traversal 2>&1); [[ $? -eq 1 ]] && grep -q "^Error: semgrep failed" <<< "$out" && grep -q "Invalid rule schema" <<< "$out" && ! grep -q missed <<< "$out" && echo PASS'
+
+    run_test "shard_rule_tests passes a single shard through unchanged" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; find_rule_tests custom-rules/web-vulns > "$d/pairs"; [[ $(shard_rule_tests "$d/pairs" 1 "$d") == "$d/shard.1.tsv" ]] && cmp -s "$d/pairs" "$d/shard.1.tsv" && echo PASS'
+
+    run_test "shard_rule_tests keeps each rule and fixture in one shard" \
+        'source scripts/lib/rule-test-utils.sh; d=$(mktemp -d); trap "rm -rf $d" EXIT; find_rule_tests custom-rules/web-vulns custom-rules/patterns > "$d/pairs"; shard_rule_tests "$d/pairs" 3 "$d" > "$d/shards"; [[ $(wc -l < "$d/shards") -eq 3 && $(cat "$d"/shard.*.tsv | sort | diff - <(sort "$d/pairs") | wc -l) -eq 0 && $(cut -f1,2 "$d"/shard.*.tsv | tr "\t" "\n" | sort -u | wc -l) -eq $(for s in "$d"/shard.*.tsv; do cut -f1,2 "$s" | tr "\t" "\n" | sort -u; done | wc -l) ]] && echo PASS'
+}
+
 # Integration Tests
 test_integration() {
     echo ""
@@ -296,6 +384,7 @@ case "$PHASE" in
             3|4|5|6|3-6) test_phase_3_6 ;;
             7|8|7-8) test_phase_7_8 ;;
             9|10|11|12|13|14|9-14) test_phase_9_14 ;;
+            rules) test_rules ;;
             integration) test_integration ;;
             edge) test_edge_cases ;;
             *) echo "Unknown phase: ${2:-}"; exit 1 ;;
@@ -307,6 +396,7 @@ case "$PHASE" in
         test_phase_3_6
         test_phase_7_8
         test_phase_9_14
+        test_rules
         test_integration
         test_edge_cases
         ;;
@@ -0,0 +1,345 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# Custom Rule Test Runner - semgrep --test semantics for custom-rules/
+#
+# Key features:
+# - Pairs every rule file with its fixtures (foo.yaml -> foo.py, foo.test.py, ...)
+# - Batched semgrep runs: findings are checked against the fixtures'
+#   ruleid:/ok:/todoruleid:/todook: annotations per rule
+# - Parallel shards: pairs are split across one single-threaded semgrep per
+#   core, balanced by fixture size
+# - Literal prefilter: rules whose required identifiers (or pattern-regex) are absent
+#   from a fixture are resolved without invoking semgrep
+# - Result cache: passing tests are keyed by sha256(rule + fixture + semgrep
+#   version + oracle version) under ~/.semgrep/cache/rule-tests and skipped
+#   on later runs
+# - SEMGREP_BIN selects the semgrep executable (e.g. a locally optimized build)
+# - Exit code 1 if any rule test fails (usable from CI / pre-commit)
+
+usage() {
+    echo "Usage: $0 [path...] [-j|--jobs <n>] [--no-prefilter] [--no-cache] [-q|--quiet]"
+    echo "Run semgrep rule tests for custom rules and their annotated fixtures."
+    echo ""
+    echo "Arguments:"
+    echo "  path                  Rule files or directories (default: custom-rules/{custom,cve,patterns,web-vulns})"
+    echo ""
+    echo "Options:"
+    echo "  -j, --jobs <n>        Parallel semgrep processes (default: number of CPU cores)"
+    echo "  --no-prefilter        Run semgrep on every rule/fixture pair"
+    echo "  --no-cache            Ignore cached results (cache: \$RULE_TEST_CACHE_DIR,"
+    echo "                        default ~/.semgrep/cache/rule-tests)"
+    echo "  -q, --quiet           Quiet mode: show progress and final summary only"
+    echo ""
+    echo "Environment:"
+    echo "  SEMGREP_BIN           semgrep executable to run (default: semgrep on PATH)"
+}
+
+PATHS=()
+USE_PREFILTER=true
+USE_CACHE=true
+JOBS=""
+QUIET_MODE=""
+
+while [[ $# -gt 0 ]]; do
+    case "$1" in
+        -h|--help)
+            usage
+            exit 0
+            ;;
+        -j|--jobs)
+            JOBS="$2"
+            shift 2
+            ;;
+        --no-prefilter)
+            USE_PREFILTER=false
+            shift
+            ;;
+        --no-cache)
+            USE_CACHE=false
+            shift
+            ;;
+        -q|--quiet)
+            QUIET_MODE="1"
+            shift
+            ;;
+        -*)
+            echo "Error: Unknown option: $1"
+            usage
+            exit 1
+            ;;
+        *)
+            PATHS+=("$1")
+            shift
+            ;;
+    esac
+done
+
+export QUIET_MODE
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$SCRIPT_DIR/lib/catalog-utils.sh"
+source "$SCRIPT_DIR/lib/rule-test-utils.sh"
+
+if [[ ${#PATHS[@]} -eq 0 ]]; then
+    for dir in custom cve patterns web-vulns; do
+        [[ -d "$CATALOG_ROOT/custom-rules/$dir" ]] && PATHS+=("$CATALOG_ROOT/custom-rules/$dir")
+    done
+fi
+
+JOBS="${JOBS:-$(detect_cpu_count)}"
+if ! [[ "$JOBS" =~ ^[1-9][0-9]*$ ]]; then
+    echo "Error: --jobs requires a positive integer, got: $JOBS"
+    exit 1
+fi
+
+SEMGREP="${SEMGREP_BIN:-semgrep}"
+if ! command -v "$SEMGREP" &> /dev/null; then
+    echo "Error: semgrep is required but not installed: $SEMGREP"
+    echo "Install: brew install semgrep"
+    exit 1
+fi
+
+# The semgrep build is part of the cache key so upgrades invalidate results;
+# a custom SEMGREP_BIN may report a stock version string, so the content of
+# the executable counts too (a rebuild in place changes the hash, not the path).
+# SEMGREP_BIN is often the Python wrapper, so the semgrep-core engine it
+# runs is hashed along with it
+SEMGREP_VERSION=$("$SEMGREP" --version 2>/dev/null | tail -1)
+if [[ -n "${SEMGREP_BIN:-}" ]]; then
+    SEMGREP_ENGINE=$("$SEMGREP" scan --dump-engine-path 2>/dev/null | tail -1) || true
+    SEMGREP_VERSION+=" ($({
+        cat "$(command -v "$SEMGREP")"
+        if [[ -f "$SEMGREP_ENGINE" ]]; then cat "$SEMGREP_ENGINE"; fi
+    } | sha256_stdin))"
+fi
+
+# Run the rules of a set of pairs over their fixtures in one semgrep process
+# Args: $1 = pairs TSV, $2 = output JSON, $3 = log file, $4... = extra semgrep args
+run_semgrep_shard() {
+    local shard="$1"
+    local output="$2"
+    local log="$3"
+    shift 3
+    local config_args=()
+    local targets=()
+    local rule fixture
+
+    while IFS= read -r rule; do
+        config_args+=("--config=$rule")
+    done < <(cut -f1 "$shard" | sort -u)
+    while IFS= read -r fixture; do
+        targets+=("$fixture")
+    done < <(cut -f2 "$shard" | sort -u)
+
+    "$SEMGREP" scan \
+        --metrics=off \
+        --disable-version-check \
+        --no-git-ignore \
+        "$@" \
+        "${config_args[@]}" \
+        --json \
+        --output="$output" \
+        "${targets[@]}" > "$log" 2>&1 || true
+}
+
+WORK_DIR=$(mktemp -d)
+trap 'rm -rf "$WORK_DIR"' EXIT
+
+find_rule_tests "${PATHS[@]}" > "$WORK_DIR/pairs.tsv"
+PAIR_COUNT=$(grep -c . "$WORK_DIR/pairs.tsv" || true)
+
+if [[ "$PAIR_COUNT" -eq 0 ]]; then
+    echo "No rule tests found in: ${PATHS[*]}"
+    exit 0
+fi
+
+# Build the literal table once for all rules, then sweep all fixtures in one pass
+if [[ "$USE_PREFILTER" == true ]]; then
+    cut -f1 "$WORK_DIR/pairs.tsv" | sort -u > "$WORK_DIR/rules.txt"
+    build_prefilter "$WORK_DIR/rules.txt" "$WORK_DIR/prefilter.tsv"
+    prefilter_rule_tests "$WORK_DIR/pairs.tsv" "$WORK_DIR/prefilter.tsv" "$WORK_DIR/run.tsv"
+else
+    cp "$WORK_DIR/pairs.tsv" "$WORK_DIR/run.tsv"
+fi
+
+RUN_COUNT=$(grep -c . "$WORK_DIR/run.tsv" || true)
+
+log_verbose "Testing $PAIR_COUNT rule/fixture pairs"
+[[ "$USE_PREFILTER" == true ]] && log_verbose "Prefilter: $((PAIR_COUNT - RUN_COUNT)) pairs have no required literal in their fixture"
+
+# Annotations of every fixture, read once: they decide prefiltered verdicts
+# here and feed the oracle after the semgrep run
+FIXTURES=()
+while IFS= read -r fixture; do
+    FIXTURES+=("$fixture")
+done < <(cut -f2 "$WORK_DIR/pairs.tsv" | sort -u)
+
+extract_annotations "${FIXTURES[@]}" > "$WORK_DIR/annotations.tsv"
+
+# Rule ids of every rule file: <rule>\t<id>
+: > "$WORK_DIR/ids.tsv"
+while IFS= read -r rule; do
+    extract_rule_ids "$rule" | while IFS= read -r id; do
+        printf '%s\t%s\n' "$rule" "$id"
+    done >> "$WORK_DIR/ids.tsv"
+done < <(cut -f1 "$WORK_DIR/pairs.tsv" | sort -u)
+
+# Verdicts for every pair: <rule>\t<fixture>\t<PASS|FAIL|CACHED|PREFILTERED>\t<details>
+# Pairs the prefilter dropped are settled in one join: semgrep cannot report
+# anything there, so they only fail if the fixture expects findings from one
+# of the rule's own ids (check_rule_tests ignores ruleid: lines for others)
+awk -F'\t' -v run="$WORK_DIR/run.tsv" -v ids="$WORK_DIR/ids.tsv" \
+        -v annotations="$WORK_DIR/annotations.tsv" -v verdicts="$WORK_DIR/verdicts.tsv" '
+    BEGIN {
+        while ((getline row < run) > 0) must_run[row] = 1
+        while ((getline row < ids) > 0) {
+            split(row, f, "\t")
+            rule_ids[f[1]] = rule_ids[f[1]] "\t" f[2]
+        }
+        while ((getline row < annotations) > 0) {
+            split(row, f, "\t")
+            if (f[3] == "ruleid") expects[f[1], f[4]] = 1
+        }
+        printf "" > verdicts
+    }
+    $0 in must_run { print; next }
+    {
+        n = split(rule_ids[$1], id, "\t")
+        for (i = 2; i <= n; i++) {
+            if (($2, id[i]) in expects) {
+                print $0 "\tFAIL\texpects findings, but no required literal is present" > verdicts
+                next
+            }
+        }
+        print $0 "\tPREFILTERED\t" > verdicts
+    }
+' "$WORK_DIR/pairs.tsv" > "$WORK_DIR/candidates.tsv"
+
+: > "$WORK_DIR/todo.tsv"
+
+while IFS=$'\t' read -r rule fixture; do
+    if [[ "$USE_CACHE" == true ]] \
+            && rule_test_cached "$(rule_test_cache_key "$rule" "$fixture" "$SEMGREP_VERSION")"; then
+        printf '%s\t%s\tCACHED\t\n' "$rule" "$fixture" >> "$WORK_DIR/verdicts.tsv"
+    else
+        printf '%s\t%s\n' "$rule" "$fixture" >> "$WORK_DIR/todo.tsv"
+    fi
+done < "$WORK_DIR/candidates.tsv"
+
+# Run every remaining rule over every remaining fixture, in one semgrep
+# process or split into size-balanced shards, then split the findings back
+# out per (rule, fixture) pair
+if [[ -s "$WORK_DIR/todo.tsv" ]]; then
+    RULE_COUNT=$(cut -f1 "$WORK_DIR/todo.tsv" | sort -u | wc -l | tr -d ' ')
+
+    TARGETS=()
+    while IFS= read -r fixture; do
+        TARGETS+=("$fixture")
+    done < <(cut -f2 "$WORK_DIR/todo.tsv" | sort -u)
+
+    [[ "$JOBS" -gt ${#TARGETS[@]} ]] && JOBS=${#TARGETS[@]}
+
+    RESULTS=()
+    if [[ "$JOBS" -eq 1 ]]; then
+        log_verbose "Running semgrep: $RULE_COUNT rule files x ${#TARGETS[@]} fixtures"
+        [[ -n "$QUIET_MODE" ]] && log_progress 0 1 "semgrep: ${#TARGETS[@]} fixtures"
+        run_semgrep_shard "$WORK_DIR/todo.tsv" "$WORK_DIR/results.json" "$WORK_DIR/results.log"
+        RESULTS+=("$WORK_DIR/results.json")
+    else
+        log_verbose "Running semgrep: $RULE_COUNT rule files x ${#TARGETS[@]} fixtures in $JOBS shards"
+
+        # One single-threaded semgrep per shard avoids oversubscribing cores
+        PIDS=()
+        while IFS= read -r shard; do
+            RESULTS+=("${shard%.tsv}.json")
+            run_semgrep_shard "$shard" "${shard%.tsv}.json" "${shard%.tsv}.log" --jobs=1 &
+            PIDS+=($!)
+        done < <(shard_rule_tests "$WORK_DIR/todo.tsv" "$JOBS" "$WORK_DIR")
+
+        done_shards=0
+        for pid in "${PIDS[@]}"; do
+            [[ -n "$QUIET_MODE" ]] && log_progress "$done_shards" "${#PIDS[@]}" "semgrep shards"
+            wait "$pid" || true
+            done_shards=$((done_shards + 1))
+        done
+    fi
+    [[ -n "$QUIET_MODE" ]] && clear_progress
+
+    # One jq pass per report validates it and flattens its errors and
+    # findings to rows for the oracle. A rule semgrep rejected on its own
+    # (e.g. a pattern that does not parse) only fails that rule's pairs, in
+    # check_rule_tests. Any other error-level error fails the run: semgrep
+    # then drops every rule in the shard (e.g. InvalidRuleSchemaError), so
+    # the shard's findings (and any PASS, which would be cached) are bogus
+    semgrep_failed=""
+    ROWS=()
+    for results in "${RESULTS[@]}"; do
+        rows="${results%.json}.rows.tsv"
+        ROWS+=("$rows")
+        if ! semgrep_json_rows "$results" > "$rows" 2> /dev/null || grep -q $'^error\t\t' "$rows"; then
+            semgrep_failed="1"
+            awk -F'\t' '$1 == "error" && $2 == "" { print "    " $4 }' "$rows" >> "$WORK_DIR/failures.log"
+            sed 's/^/    /' "${results%.json}.log" >> "$WORK_DIR/failures.log"
+        fi
+    done
+
+    if [[ -n "$semgrep_failed" ]]; then
+        echo "Error: semgrep failed"
+        cat "$WORK_DIR/failures.log"
+        exit 1
+    fi
+
+    check_rule_tests "$WORK_DIR/todo.tsv" "$WORK_DIR/ids.tsv" \
+        "$WORK_DIR/annotations.tsv" "${ROWS[@]}" >> "$WORK_DIR/verdicts.tsv"
+fi
+
+log_verbose ""
+
+passed=0
+failed=0
+skipped=0
+cached=0
+FAILED_TESTS=()
+
+# Report in discovery order
+while IFS=$'\t' read -r rule fixture status details; do
+    name="$(basename "$fixture")"
+    case "$status" in
+        PASS)
+            passed=$((passed + 1))
+            [[ "$USE_CACHE" == true ]] \
+                && rule_test_cache_store "$(rule_test_cache_key "$rule" "$fixture" "$SEMGREP_VERSION")"
+            log_verbose "[$name] PASS"
+            ;;
+        CACHED)
+            passed=$((passed + 1))
+            cached=$((cached + 1))
+            log_verbose "[$name] PASS (cached)"
+            ;;
+        PREFILTERED)
+            skipped=$((skipped + 1))
+            log_verbose "[$name] PASS (prefiltered)"
+            ;;
+        *)
+            failed=$((failed + 1))
+            FAILED_TESTS+=("$fixture ($(basename "$rule")): $details")
+            log_verbose "[$name] FAIL: $details"
+            ;;
+    esac
+done < <(awk -F'\t' 'NR == FNR { verdict[$1 FS $2] = $0; next }
+                     ($1 FS $2) in verdict { print verdict[$1 FS $2] }' \
+            "$WORK_DIR/verdicts.tsv" "$WORK_DIR/pairs.tsv")
+
+log_verbose ""
+log_verbose "=== Summary ==="
+log_summary "Rule tests: $passed passed ($cached cached), $failed failed, $skipped prefiltered"
+
+if [[ "$failed" -gt 0 ]]; then
+    echo ""
+    echo "Failed:"
+    for t in "${FAILED_TESTS[@]}"; do
+        echo "  $t"
+    done
+    exit 1
+fi
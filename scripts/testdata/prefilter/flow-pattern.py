@@ -0,0 +1,3 @@
+def handler(x):
+    # ruleid: flow-pattern
+    return evalx(x)
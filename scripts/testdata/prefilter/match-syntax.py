@@ -0,0 +1,3 @@
+def handler(x):
+    # ruleid: match-syntax
+    return evalx(x)
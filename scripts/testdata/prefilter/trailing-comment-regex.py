@@ -0,0 +1,2 @@
+# ruleid: trailing-comment-regex
+secret_key = "hunter2"
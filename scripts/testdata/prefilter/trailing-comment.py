@@ -0,0 +1,3 @@
+def handler(x):
+    # ruleid: trailing-comment
+    return evalx(x)